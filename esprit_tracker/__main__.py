@@ -0,0 +1,4 @@
+from esprit_tracker.cli import app
+
+if __name__ == "__main__":
+    app()
@@ -1,16 +1,43 @@
+import atexit
+import hashlib
+import itertools
 import json
+import math
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 
-import requests
 import typer
-from rich.console import Console
-from rich.table import Table
+
+try:  # optional speedup for decoding large search responses
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    from rich.table import Table
 
 app = typer.Typer()
-console = Console()
+
+
+class _LazyConsole:
+    """Defers importing rich until the first print, keeping cold start
+    (e.g. --help) free of the import cost."""
+
+    _real = None
+
+    def __getattr__(self, name):
+        if _LazyConsole._real is None:
+            from rich.console import Console
+
+            _LazyConsole._real = Console()
+        return getattr(_LazyConsole._real, name)
+
+
+console = _LazyConsole()
 
 ESPRIT_PI_ASCII = r"""
   _____ ____  ____  ____  ___ _____      ____ ___ 
@@ -28,71 +55,343 @@ _PROJECT_SUFFIXES = re.compile(
     re.IGNORECASE,
 )
 
+# Compiled once; the case-insensitive match replaces a per-repo .upper()
+_ESPRIT_PI_PREFIX = re.compile(r"^ESPRIT-PI", re.IGNORECASE)
+
 MIN_YEAR = 2025
 
+# Server-side counterpart of filter_by_year: excluding old repos in the
+# query itself shrinks the result set before any page is transferred.
+_CREATED_QUALIFIER = f"created:>={MIN_YEAR}-01-01"
+
+
+def _loads(data: bytes):
+    """Decode JSON bytes, preferring orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# -----------------------------
+# RESPONSE CACHE
+# -----------------------------
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "esprit_tracker")
+_CACHE_TTL = 900  # seconds
+
+
+def _cache_path(key: str) -> str:
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return os.path.join(_CACHE_DIR, f"{digest}.json")
+
+
+def _cache_read(path: str) -> Optional[dict]:
+    """Return the raw cache entry (any age), or None if unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return _loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_load(path: str) -> Optional[dict]:
+    """Return the cached response body, or None if missing/expired."""
+    entry = _cache_read(path)
+    if entry is None or time.time() - entry.get("fetched_at", 0) > _CACHE_TTL:
+        return None
+    return entry.get("data")
+
+
+def _cache_store(path: str, data: dict, etag: Optional[str] = None):
+    entry = {"fetched_at": time.time(), "data": data}
+    if etag:
+        entry["etag"] = etag
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+    except OSError:
+        pass  # caching is best-effort
+
 
 # -----------------------------
 # GitHub API
 # -----------------------------
+def _github_tokens() -> List[str]:
+    """Tokens for the API; GITHUB_TOKENS may hold a comma-separated pool."""
+    raw = os.environ.get("GITHUB_TOKENS") or os.environ.get("GITHUB_TOKEN") or ""
+    return [t.strip() for t in raw.split(",") if t.strip()]
+
+
+_TOKENS = _github_tokens()
+# With several tokens, rotate Authorization per request so the 5000 req/h
+# primary rate limit is spread across the whole pool.
+_TOKEN_CYCLE = itertools.cycle(_TOKENS) if len(_TOKENS) > 1 else None
+# Tokens benched after exhausting their rate limit: token -> reset epoch
+_PARKED_TOKENS: Dict[str, float] = {}
+
+
+def _auth_headers() -> dict:
+    if _TOKEN_CYCLE is None:
+        return {}
+    for _ in range(len(_TOKENS)):
+        token = next(_TOKEN_CYCLE)
+        if _PARKED_TOKENS.get(token, 0) <= time.time():
+            return {"Authorization": f"Bearer {token}"}
+    # Whole pool is parked; send the next token anyway rather than none.
+    return {"Authorization": f"Bearer {next(_TOKEN_CYCLE)}"}
+
+
+def _park_exhausted_token(response, **kwargs):
+    """Session hook: bench a token that hit its rate limit until reset."""
+    if response.status_code != 403:
+        return
+    if response.headers.get("X-RateLimit-Remaining") != "0":
+        return
+    token = response.request.headers.get("Authorization", "").rpartition(" ")[2]
+    if token:
+        try:
+            reset = float(response.headers.get("X-RateLimit-Reset", 0))
+        except ValueError:
+            reset = 0
+        _PARKED_TOKENS[token] = reset or time.time() + 60
+
+
 def get_github_headers():
     headers = {
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28",
     }
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    if _TOKENS:
+        headers["Authorization"] = f"Bearer {_TOKENS[0]}"
     return headers
 
 
-def fetch_github_repos(query: str, per_page: int = 100) -> List[dict]:
-    repos = []
-    page = 1
+# Shared session so paginated calls reuse one keep-alive connection
+# instead of paying a TCP + TLS handshake per page. Created lazily so
+# importing the CLI (and rendering --help) never pays for requests.
+_SESSION = None
 
-    while True:
-        url = "https://api.github.com/search/repositories"
-        params = {"q": query, "per_page": per_page, "page": page}
 
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                headers=get_github_headers(),
-                timeout=10,
-            )
-            response.raise_for_status()
-            data = response.json()
+def _get_session():
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
 
-            items = data.get("items", [])
-            if not items:
-                break
-
-            repos.extend(items)
+        # Retry transient failures with exponential backoff; GitHub sends
+        # Retry-After on 429, which urllib3 honours. POST is included
+        # because the GraphQL search query is idempotent.
+        retry = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "POST"),
+        )
+        _SESSION = requests.Session()
+        _SESSION.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry),
+        )
+        _SESSION.headers.update(get_github_headers())
+        _SESSION.hooks["response"].append(_park_exhausted_token)
+        atexit.register(_SESSION.close)
+    return _SESSION
+
+
+# GraphQL lets us request exactly the fields the tool consumes instead of
+# the ~80 the REST search endpoint returns, shrinking payloads 10-20x.
+_GRAPHQL_SEARCH = """
+query($q: String!, $cursor: String) {
+  search(query: $q, type: REPOSITORY, first: 100, after: $cursor) {
+    nodes {
+      ... on Repository {
+        name
+        owner { login }
+        stargazerCount
+        url
+        createdAt
+      }
+    }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
 
-            if len(items) < per_page or len(repos) >= 1000:
-                break
 
-            page += 1
+def _fetch_repos_graphql(
+    query: str, refresh: bool = False, max_pages: Optional[int] = None
+) -> List[dict]:
+    # max_pages is part of the key so a capped call's truncated result is
+    # never served to a later uncapped call for the same query.
+    cache_path = _cache_path(f"graphql|{query}|{max_pages}")
+    if not refresh:
+        cached = _cache_load(cache_path)
+        if cached is not None:
+            return cached["items"]
 
-        except Exception as e:
-            console.print(f"[red]Error: {e}[/red]")
+    repos = []
+    cursor = None
+    pages = 0
+    while True:
+        response = _get_session().post(
+            "https://api.github.com/graphql",
+            json={"query": _GRAPHQL_SEARCH, "variables": {"q": query, "cursor": cursor}},
+            headers=_auth_headers(),
+            timeout=10,
+        )
+        response.raise_for_status()
+        payload = _loads(response.content)
+        if payload.get("errors"):
+            raise RuntimeError(payload["errors"][0].get("message", "GraphQL error"))
+
+        search = payload["data"]["search"]
+        for node in search["nodes"]:
+            if not node:
+                continue
+            # Map back to the REST field names the rest of the tool uses
+            repos.append({
+                "name": node.get("name", ""),
+                "owner": {"login": (node.get("owner") or {}).get("login", "")},
+                "stargazers_count": node.get("stargazerCount", 0),
+                "html_url": node.get("url", ""),
+                "created_at": node.get("createdAt", ""),
+            })
+
+        pages += 1
+        page_info = search["pageInfo"]
+        if not page_info["hasNextPage"] or len(repos) >= 1000:
+            break
+        if max_pages is not None and pages >= max_pages:
             break
+        cursor = page_info["endCursor"]
 
+    _cache_store(cache_path, {"items": repos})
     return repos
 
 
+def _project_repo(item: dict) -> dict:
+    """Keep only the fields the tool consumes; the REST search payload
+    carries ~80 per repo."""
+    return {
+        "name": item.get("name", ""),
+        "owner": {"login": (item.get("owner") or {}).get("login", "")},
+        "stargazers_count": item.get("stargazers_count", 0),
+        "html_url": item.get("html_url", ""),
+        "created_at": item.get("created_at", ""),
+    }
+
+
+def _fetch_search_page(
+    query: str, page: int, per_page: int, refresh: bool = False
+) -> dict:
+    cache_path = _cache_path(f"{query}|{page}|{per_page}")
+    entry = None
+    if not refresh:
+        entry = _cache_read(cache_path)
+        if entry is not None and time.time() - entry.get("fetched_at", 0) <= _CACHE_TTL:
+            return entry["data"]
+
+    headers = _auth_headers()
+    if entry is not None and entry.get("etag"):
+        # Revalidate the stale copy: a 304 carries no body and does not
+        # count against the search rate limit.
+        headers["If-None-Match"] = entry["etag"]
+
+    response = _get_session().get(
+        "https://api.github.com/search/repositories",
+        params={"q": query, "per_page": per_page, "page": page},
+        headers=headers,
+        timeout=10,
+    )
+    if response.status_code == 304 and entry is not None:
+        _cache_store(cache_path, entry["data"], entry.get("etag"))
+        return entry["data"]
+    response.raise_for_status()
+    raw = _loads(response.content)
+    data = {
+        "total_count": raw.get("total_count", 0),
+        "items": [_project_repo(item) for item in raw.get("items", [])],
+    }
+    _cache_store(cache_path, data, response.headers.get("ETag"))
+    return data
+
+
+# In-process memo so overlapping queries within one invocation resolve
+# once; cross-invocation overlap is served by the on-disk cache.
+_QUERY_MEMO: Dict[tuple, List[dict]] = {}
+
+
+def fetch_github_repos(
+    query: str,
+    per_page: int = 100,
+    refresh: bool = False,
+    max_pages: Optional[int] = None,
+) -> List[dict]:
+    key = (query, per_page, max_pages)
+    if not refresh and key in _QUERY_MEMO:
+        return list(_QUERY_MEMO[key])
+
+    try:
+        repos = _fetch_repos(query, per_page, refresh, max_pages)
+    except Exception as e:
+        # Deliberately not memoized: an in-process retry of the same
+        # query should hit the network again, not a cached failure.
+        console.print(f"[red]Error: {e}[/red]")
+        return []
+
+    _QUERY_MEMO[key] = repos
+    return list(repos)
+
+
+def _fetch_repos(
+    query: str, per_page: int, refresh: bool, max_pages: Optional[int]
+) -> List[dict]:
+    # GraphQL needs authentication; anonymous runs stay on REST search.
+    if _TOKENS:
+        return _fetch_repos_graphql(query, refresh, max_pages)
+
+    data = _fetch_search_page(query, 1, per_page, refresh)
+
+    items = data.get("items", [])
+    if len(items) < per_page:
+        return items
+
+    # The first response carries total_count, so pages 2..N are known up
+    # front and can be fetched concurrently instead of one RTT at a time.
+    # The Search API caps results at 1000.
+    total = min(data.get("total_count", 0), 1000)
+    n_pages = math.ceil(total / per_page)
+    if max_pages is not None:
+        n_pages = min(n_pages, max_pages)
+
+    pages = [items]
+    if n_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(n_pages - 1, 10)) as pool:
+            futures = [
+                pool.submit(_fetch_search_page, query, page, per_page, refresh)
+                for page in range(2, n_pages + 1)
+            ]
+            for future in futures:
+                try:
+                    pages.append(future.result().get("items", []))
+                except Exception as e:
+                    console.print(f"[red]Error: {e}[/red]")
+
+    # Flatten once rather than growing the result list page by page
+    return list(itertools.chain.from_iterable(pages))
+
+
 def fetch_contributors(owner: str, repo: str) -> List[str]:
     """Fetch contributor logins for a repository."""
     url = f"https://api.github.com/repos/{owner}/{repo}/contributors"
     try:
-        response = requests.get(
-            url,
-            headers=get_github_headers(),
-            params={"per_page": 100},
-            timeout=10,
+        response = _get_session().get(
+            url, params={"per_page": 100}, headers=_auth_headers(), timeout=10
         )
         if response.status_code == 200:
-            return [c.get("login", "") for c in response.json() if c.get("login")]
+            contributors = _loads(response.content)
+            return [c.get("login", "") for c in contributors if c.get("login")]
         return []
     except Exception:
         return []
@@ -103,16 +402,15 @@ def fetch_contributors(owner: str, repo: str) -> List[str]:
 # -----------------------------
 def filter_by_year(repos: List[dict], min_year: int = MIN_YEAR) -> List[dict]:
     """Remove repos created before *min_year*."""
+    # ISO-8601 timestamps sort lexicographically, so comparing the year
+    # prefix as a string skips per-repo int() parsing and exception
+    # handling. Malformed dates pass through, as before.
+    cutoff = str(min_year)
     filtered = []
     for repo in repos:
-        created = repo.get("created_at", "")
-        if created:
-            try:
-                year = int(created[:4])
-                if year < min_year:
-                    continue
-            except (ValueError, IndexError):
-                pass
+        year = repo.get("created_at", "")[:4]
+        if year.isdigit() and year < cutoff:
+            continue
         filtered.append(repo)
     return filtered
 
@@ -151,32 +449,43 @@ def deduplicate_repos(repos: List[dict]) -> List[dict]:
 # -----------------------------
 # SEARCH
 # -----------------------------
-def search_pi_mode(pi_name: str) -> List[dict]:
+def search_pi_mode(pi_name: str, refresh: bool = False) -> List[dict]:
     pi_name = pi_name.upper()
-    repos = fetch_github_repos(f"ESPRIT-{pi_name} in:name")
+    repos = fetch_github_repos(
+        f"ESPRIT-{pi_name} in:name {_CREATED_QUALIFIER}", refresh=refresh
+    )
 
-    pattern = re.compile(rf"^ESPRIT-{pi_name}-.+", re.IGNORECASE)
-    repos = [r for r in repos if pattern.match(r.get("name", ""))]
+    match = re.compile(rf"^ESPRIT-{pi_name}-.+", re.IGNORECASE).match
+    repos = [r for r in repos if match(r.get("name", ""))]
     repos = filter_by_year(repos)
     return deduplicate_repos(repos)
 
 
-def search_class_mode(class_name: str) -> List[dict]:
-    class_name = class_name.upper()
-    repos = fetch_github_repos(f"ESPRIT {class_name} in:name")
+def search_class_mode(class_names: List[str], refresh: bool = False) -> List[dict]:
+    names = [name.upper() for name in class_names]
+    repos = []
+    for name in names:
+        repos.extend(
+            fetch_github_repos(
+                f"ESPRIT {name} in:name {_CREATED_QUALIFIER}", refresh=refresh
+            )
+        )
 
-    pattern = re.compile(rf"^ESPRIT-.+-{class_name}-.+", re.IGNORECASE)
-    repos = [r for r in repos if pattern.match(r.get("name", ""))]
+    # One compiled alternation scans each repo name once, however many
+    # classes were requested, instead of one regex pass per class.
+    alternation = "|".join(re.escape(name) for name in names)
+    match = re.compile(rf"^ESPRIT-.+-(?:{alternation})-.+", re.IGNORECASE).match
+    repos = [r for r in repos if match(r.get("name", ""))]
     repos = filter_by_year(repos)
     return deduplicate_repos(repos)
 
 
-def search_all() -> List[dict]:
-    repos = fetch_github_repos("ESPRIT-PI in:name")
-    repos = [
-        r for r in repos
-        if r.get("name", "").upper().startswith("ESPRIT-PI")
-    ]
+def search_all(refresh: bool = False) -> List[dict]:
+    repos = fetch_github_repos(
+        f"ESPRIT-PI in:name {_CREATED_QUALIFIER}", refresh=refresh
+    )
+    match = _ESPRIT_PI_PREFIX.match
+    repos = [r for r in repos if match(r.get("name", ""))]
     repos = filter_by_year(repos)
     return deduplicate_repos(repos)
 
@@ -216,58 +525,49 @@ def group_by_pi(repos: List[dict]) -> Dict[str, List[dict]]:
 # -----------------------------
 # DISPLAY
 # -----------------------------
-def display_grouped_by_class(repos: List[dict]):
-    grouped = group_by_class(repos)
-
-    for cls, repo_list in grouped.items():
-        console.print(f"\n[bold cyan]Class: {cls}[/bold cyan]")
+def _build_repo_table(repo_list: List[dict]) -> "Table":
+    from rich.table import Table
+
+    table = Table()
+    table.add_column("Repository", style="green")
+    table.add_column("Owner")
+    table.add_column("Stars")
+    table.add_column("URL", style="blue", no_wrap=False, overflow="fold")
+
+    # Precompute all cell strings in one pass, then add the rows
+    rows = [
+        (
+            repo.get("name", ""),
+            repo.get("owner", {}).get("login", ""),
+            str(repo.get("stargazers_count", 0)),
+            "[link={0}]{0}[/link]".format(repo.get("html_url", "")),
+        )
+        for repo in repo_list
+    ]
+    for row in rows:
+        table.add_row(*row)
+    return table
 
-        table = Table()
-        table.add_column("Repository", style="green")
-        table.add_column("Owner")
-        table.add_column("Stars")
-        table.add_column("URL", style="blue", no_wrap=False, overflow="fold")
 
-        for repo in repo_list:
-            url = repo.get("html_url", "")
+def _print_grouped(grouped: Dict[str, List[dict]], label: str, style: str, total: int):
+    """Render every section into one Group so the whole report goes out
+    in a single buffered print instead of one write per section."""
+    from rich.console import Group
 
-            table.add_row(
-                repo.get("name", ""),
-                repo.get("owner", {}).get("login", ""),
-                str(repo.get("stargazers_count", 0)),
-                f"[link={url}]{url}[/link]",
-            )
+    renderables = []
+    for key, repo_list in grouped.items():
+        renderables.append(f"\n[bold {style}]{label}: {key}[/bold {style}]")
+        renderables.append(_build_repo_table(repo_list))
+    renderables.append(f"\n[bold green]Total: {total}[/bold green]")
+    console.print(Group(*renderables))
 
-        console.print(table)
 
-    console.print(f"\n[bold green]Total: {len(repos)}[/bold green]")
+def display_grouped_by_class(repos: List[dict]):
+    _print_grouped(group_by_class(repos), "Class", "cyan", len(repos))
 
 
 def display_grouped_by_pi(repos: List[dict]):
-    grouped = group_by_pi(repos)
-
-    for pi, repo_list in grouped.items():
-        console.print(f"\n[bold magenta]PI: {pi}[/bold magenta]")
-
-        table = Table()
-        table.add_column("Repository", style="green")
-        table.add_column("Owner")
-        table.add_column("Stars")
-        table.add_column("URL", style="blue", no_wrap=False, overflow="fold")
-
-        for repo in repo_list:
-            url = repo.get("html_url", "")
-
-            table.add_row(
-                repo.get("name", ""),
-                repo.get("owner", {}).get("login", ""),
-                str(repo.get("stargazers_count", 0)),
-                f"[link={url}]{url}[/link]",
-            )
-
-        console.print(table)
-
-    console.print(f"\n[bold green]Total: {len(repos)}[/bold green]")
+    _print_grouped(group_by_pi(repos), "PI", "magenta", len(repos))
 
 
 # -----------------------------
@@ -313,11 +613,12 @@ def export_repos_to_json(repos: List[dict], output_path: str):
 def pi_repos(
     pi_name: str,
     json_out: Optional[str] = typer.Option(None, "--json", help="Export results to a JSON file"),
+    refresh: bool = typer.Option(False, "--refresh", help="Bypass the local response cache"),
 ):
     console.print(ESPRIT_PI_ASCII, style="bold blue")
     console.print(f"[bold]Searching ESPRIT-{pi_name}...[/bold]\n")
 
-    repos = search_pi_mode(pi_name)
+    repos = search_pi_mode(pi_name, refresh=refresh)
 
     if json_out:
         export_repos_to_json(repos, json_out)
@@ -327,13 +628,14 @@ def pi_repos(
 
 @app.command()
 def class_repos(
-    class_name: str,
+    class_names: List[str] = typer.Argument(..., help="One or more class names, e.g. 4SE3 4TWIN1"),
     json_out: Optional[str] = typer.Option(None, "--json", help="Export results to a JSON file"),
+    refresh: bool = typer.Option(False, "--refresh", help="Bypass the local response cache"),
 ):
     console.print(ESPRIT_PI_ASCII, style="bold blue")
-    console.print(f"[bold]Searching class {class_name}...[/bold]\n")
+    console.print(f"[bold]Searching class {', '.join(class_names)}...[/bold]\n")
 
-    repos = search_class_mode(class_name)
+    repos = search_class_mode(class_names, refresh=refresh)
 
     if json_out:
         export_repos_to_json(repos, json_out)
@@ -344,11 +646,12 @@ def class_repos(
 @app.command()
 def all_repos(
     json_out: Optional[str] = typer.Option(None, "--json", help="Export results to a JSON file"),
+    refresh: bool = typer.Option(False, "--refresh", help="Bypass the local response cache"),
 ):
     console.print(ESPRIT_PI_ASCII, style="bold blue")
     console.print("[bold]Searching all ESPRIT-PI repositories...[/bold]\n")
 
-    repos = search_all()
+    repos = search_all(refresh=refresh)
 
     if json_out:
         export_repos_to_json(repos, json_out)